@@ -123,9 +123,14 @@ Limitations:
 
 import ctypes
 import argparse
+import contextlib
+import json
 import os
 import re
+import shutil
+import socket
 import stat
+import struct
 import subprocess
 import sys
 import time
@@ -157,6 +162,7 @@ def check_output(*args, **kwargs):
     return s.replace(os.linesep, '\n')
 
 HANDBRAKE = 'HandBrakeCLI'
+PRESET = 'Production Standard'
 
 TITLE_COUNT_REGEXES = [
         re.compile(r'^Scanning title \d+ of (\d+)\.\.\.$'),
@@ -280,12 +286,78 @@ class DVD:
         self.mountpoint = mountpoint
         self.verbose = verbose
 
-    def RipTitle(self, task, output, dry_run, verbose):
+    def RipTitle(self, task, output, dry_run, verbose, segments=1):
+        """
+        Encodes task into output.
+
+        Returns True if the encode completed.
+        """
         if verbose:
             print('Title Scan:')
             pprint(task.title.info)
             print('-' * 78)
 
+        chapter_ranges = PlanSegments(task, segments)
+        if len(chapter_ranges) > 1:
+            return self.RipSegments(task, chapter_ranges, output, dry_run,
+                    verbose)
+
+        chapters = None if task.chapter is None else str(task.chapter)
+        args = self.HandBrakeArgs(task, chapters, output)
+        if verbose:
+            PrintCommand(args)
+        if dry_run:
+            return False
+        if verbose:
+            retcode = subprocess.call(args)
+            if retcode:
+                warn('%s exited with status %d.' % (HANDBRAKE, retcode))
+                return False
+        else:
+            check_err(args)
+        return True
+
+    def RipSegments(self, task, chapter_ranges, output, dry_run, verbose):
+        """
+        Encodes each of chapter_ranges of task's title concurrently, and
+        then losslessly concatenates the segments into output.
+
+        Returns True if the encode completed.
+        """
+        print('Encoding %d segments in parallel: chapters %s'
+                % (len(chapter_ranges), ', '.join(
+                    '%d-%d' % r for r in chapter_ranges)))
+        segment_files, log_files, join_files = SegmentTempFiles(output,
+                len(chapter_ranges))
+        commands = [self.HandBrakeArgs(task, '%d-%d' % r, segment_file)
+                for r, segment_file in zip(chapter_ranges, segment_files)]
+        if verbose:
+            for args in commands:
+                PrintCommand(args)
+        if dry_run:
+            return False
+
+        try:
+            EncodeSegments(commands, log_files)
+        except BaseException:
+            RemoveFiles(segment_files)
+            raise
+        finally:
+            RemoveFiles(log_files)
+
+        try:
+            ConcatenateSegments(segment_files, output, *join_files,
+                    verbose=verbose)
+        except (OSError, subprocess.CalledProcessError) as exc:
+            RemoveFiles([output])
+            raise UserError('joining segments failed (%s); encoded segments'
+                    ' kept in %s' % (exc, ', '.join(map(repr, segment_files))))
+        finally:
+            RemoveFiles(join_files)
+        RemoveFiles(segment_files)
+        return True
+
+    def HandBrakeArgs(self, task, chapters, output):
         audio_tracks = task.title.info['audio tracks'].keys()
         audio_encoders = ['faac'] * len(audio_tracks)
         subtitles = task.title.info['subtitle tracks'].keys()
@@ -293,14 +365,14 @@ class DVD:
         args = [
             HANDBRAKE,
             '--title', str(task.title.number),
-            '--preset', "Production Standard",
+            '--preset', PRESET,
             '--encoder', 'x264',
             '--audio', ','.join(audio_tracks),
             '--aencoder', ','.join(audio_encoders),
         ]
-        if task.chapter is not None:
+        if chapters is not None:
             args += [
-                '--chapters', str(task.chapter),
+                '--chapters', chapters,
             ]
         if subtitles:
             args += [
@@ -313,15 +385,7 @@ class DVD:
             '--input', self.mountpoint,
             '--output', output,
         ]
-        if verbose:
-            print(' '.join(('\n  ' + a)
-                if a.startswith('-') else a for a in args))
-            print('-' * 78)
-        if not dry_run:
-            if verbose:
-                subprocess.call(args)
-            else:
-                check_err(args)
+        return args
 
     def ScanTitle(self, i):
         for line in check_err([
@@ -371,6 +435,26 @@ class DVD:
                     else:
                         warn("Cannot parse scan of title %d." % i)
 
+    def FindMainFeatureNumber(self, title_numbers):
+        """
+        Returns the title number of the main feature, chosen from the IFO
+        tables without scanning any titles, or None if the IFO tables
+        cannot be used.
+        """
+        try:
+            ifo_titles = [t for t in ReadIfoTitles(self.mountpoint)
+                    if not title_numbers or t.number in title_numbers]
+        except (OSError, ValueError, IndexError, struct.error) as exc:
+            warn('Cannot read IFO tables (%s); scanning all titles.' % exc)
+            return None
+        main_feature = RankMainFeature(ifo_titles, self.verbose)
+        if main_feature is None:
+            warn('No main feature candidates in IFO tables;'
+                    ' scanning all titles.')
+            return None
+        print('Selected title %d as main feature.' % main_feature.number)
+        return main_feature.number
+
     def Eject(self):
         if os.name == 'nt':
             if len(self.mountpoint) < 4 and self.mountpoint[1] == ':':
@@ -387,13 +471,185 @@ class DVD:
                 return
             time.sleep(1.0 / EJECT_ATTEMPTS_PER_SECOND)
 
-def ParseDuration(s):
-    result = 0
-    for field in s.strip().split(':'):
-        result *= 60
-        result += int(field)
+def PrintCommand(args):
+    print(' '.join(('\n  ' + a)
+        if a.startswith('-') else a for a in args))
+    print('-' * 78)
+
+# A segment must cover at least this fraction of total / segments.
+MIN_SEGMENT_SHARE = 0.5
+
+def PlanSegments(task, segments):
+    """
+    Splits the chapters of task into at most segments contiguous ranges of
+    roughly equal duration.
+
+    Ranges shorter than MIN_SEGMENT_SHARE of an even split are merged into
+    their neighbours, so fewer ranges than requested may be returned.
+
+    Returns a list of (first, last) chapter number pairs. Tasks that
+    cannot be split yield a single range (or none, for chapter tasks).
+    """
+    if task.chapter is not None:
+        return []
+    chapters = list(ParseChapters(task.title.info['chapters']))
+    if not chapters:
+        return []
+    total = sum(c.duration.in_seconds() for c in chapters)
+    if segments <= 1 or total <= 0:
+        return [(chapters[0].number, chapters[-1].number)]
+    target = total / segments
+    result = []
+    first = chapters[0].number
+    elapsed = 0
+    segment_seconds = 0
+    for i, chapter in enumerate(chapters[:-1]):
+        elapsed += chapter.duration.in_seconds()
+        segment_seconds += chapter.duration.in_seconds()
+        if (len(result) < segments - 1
+                and elapsed >= target * (len(result) + 1)
+                and segment_seconds >= MIN_SEGMENT_SHARE * target):
+            result.append((first, chapter.number))
+            first = chapters[i + 1].number
+            segment_seconds = 0
+    segment_seconds += chapters[-1].duration.in_seconds()
+    if result and segment_seconds < MIN_SEGMENT_SHARE * target:
+        first = result.pop()[0]
+    result.append((first, chapters[-1].number))
     return result
 
+def SegmentTempFiles(output, count):
+    """
+    Returns the names of the temporary segment, log and join files used
+    when encoding output in count segments.
+    """
+    segment_files = ['%s.part%02d.mp4' % (output, i + 1)
+            for i in range(count)]
+    log_files = [segment_file + '.log' for segment_file in segment_files]
+    join_files = [output + '.concat.txt', output + '.chapters.txt']
+    return segment_files, log_files, join_files
+
+def TaskTempFiles(task, output, segments):
+    """
+    Returns the names of the temporary files ripping task into output
+    will use.
+    """
+    count = len(PlanSegments(task, segments))
+    if count <= 1:
+        return []
+    return [name for names in SegmentTempFiles(output, count)
+            for name in names]
+
+FFMPEG = 'ffmpeg'
+FFPROBE = 'ffprobe'
+
+SEGMENT_POLL_SECONDS = 1
+
+def RemoveFiles(filenames):
+    for filename in filenames:
+        if os.path.exists(filename):
+            os.remove(filename)
+
+def EncodeSegments(commands, log_files):
+    """
+    Runs commands concurrently, sending the stderr of each to the
+    corresponding log file.
+
+    Raises CalledProcessError as soon as any command fails. On failure or
+    interruption the remaining commands are terminated.
+    """
+    processes = []
+    logs = []
+    try:
+        for args, log_file in zip(commands, log_files):
+            log = open(log_file, 'w+b')
+            logs.append(log)
+            processes.append(subprocess.Popen(args,
+                stdout=subprocess.DEVNULL, stderr=log))
+        pending = list(zip(commands, logs, processes))
+        while pending:
+            for args, log, process in list(pending):
+                retcode = process.poll()
+                if retcode is None:
+                    continue
+                pending.remove((args, log, process))
+                if retcode:
+                    log.seek(0)
+                    raise subprocess.CalledProcessError(retcode, args,
+                            output=log.read())
+            if pending:
+                time.sleep(SEGMENT_POLL_SECONDS)
+    finally:
+        for process in processes:
+            if process.poll() is None:
+                process.terminate()
+        for process in processes:
+            process.wait()
+        for log in logs:
+            log.close()
+
+def ProbeSegment(filename):
+    """
+    Returns the duration in seconds and the chapters of an encoded segment.
+    """
+    probe = json.loads(check_output([
+        FFPROBE,
+        '-v', 'error',
+        '-print_format', 'json',
+        '-show_format',
+        '-show_chapters',
+        filename]))
+    return float(probe['format']['duration']), probe.get('chapters', [])
+
+def ConcatenateSegments(segment_files, output, list_file, metadata_file,
+        verbose=False):
+    """
+    Joins segment_files into output without re-encoding, carrying all
+    video, audio and subtitle streams across and renumbering the chapter
+    markers of each segment.
+
+    HandBrake's chapter text track is not mapped, since ffmpeg exposes it
+    as a data stream that the mp4 muxer cannot write; the chapters are
+    rebuilt from metadata_file instead.
+    """
+    with open(list_file, 'w', encoding=CHAR_ENCODING) as f:
+        for segment_file in segment_files:
+            f.write("file '%s'\n"
+                    % os.path.abspath(segment_file).replace("'", "'\\''"))
+    with open(metadata_file, 'w', encoding=CHAR_ENCODING) as f:
+        f.write(';FFMETADATA1\n')
+        offset = 0.0
+        number = 0
+        for segment_file in segment_files:
+            duration, chapters = ProbeSegment(segment_file)
+            for chapter in chapters:
+                number += 1
+                start = offset + float(chapter['start_time'])
+                end = offset + float(chapter['end_time'])
+                f.write('[CHAPTER]\nTIMEBASE=1/1000\nSTART=%d\nEND=%d\n'
+                        'title=Chapter %d\n'
+                        % (round(1000 * start), round(1000 * end), number))
+            offset += duration
+    args = [
+        FFMPEG,
+        '-v', 'error',
+        '-f', 'concat',
+        '-safe', '0',
+        '-i', list_file,
+        '-f', 'ffmetadata',
+        '-i', metadata_file,
+        '-map', '0:v',
+        '-map', '0:a?',
+        '-map', '0:s?',
+        '-map_chapters', '1',
+        '-c', 'copy',
+        '-movflags', '+faststart',
+        output,
+    ]
+    if verbose:
+        PrintCommand(args)
+    check_err(args)
+
 def FindMountPoint(dev, timeout):
     regex = re.compile(r'^' + re.escape(os.path.realpath(dev)) + r'\b')
 
@@ -415,10 +671,194 @@ def FindMainFeature(titles, verbose=False):
         print('Attempting to determine main feature of %d titles...'
                 % len(titles))
     main_feature = max(titles,
-            key=lambda title: ParseDuration(title.info['duration']))
+            key=lambda title: title.info['duration'].in_seconds())
     if verbose:
         print('Selected %r as main feature.' % main_feature.number)
         print()
+    return main_feature
+
+DVD_SECTOR_SIZE = 2048
+
+# Frame rates encoded in the top two bits of the frame byte of an IFO
+# playback time.
+IFO_FRAME_RATES = {1: 25.0, 3: 30000 / 1001}
+
+Pgc = namedtuple('Pgc', 'seconds entry_cells cells')
+Cell = namedtuple('Cell', 'seconds first_sector angle')
+IfoTitle = namedtuple('IfoTitle',
+        'number seconds chapter_seconds cell_sectors')
+
+def FindVideoTsFile(mountpoint, name):
+    for directory in ('VIDEO_TS', 'video_ts'):
+        for filename in (name, name.lower()):
+            path = os.path.join(mountpoint, directory, filename)
+            if os.path.exists(path):
+                return path
+    raise ValueError('Cannot find %s' % name)
+
+def ReadIfo(path, magic):
+    with open(path, 'rb') as f:
+        data = f.read()
+    if not data.startswith(magic):
+        raise ValueError('%r does not start with %r' % (path, magic))
+    return data
+
+def ParseIfoTime(data, offset):
+    """
+    Parses a BCD encoded playback time, returning seconds.
+    """
+    def bcd(b):
+        return (b >> 4) * 10 + (b & 0x0f)
+    hours, minutes, seconds, frames = data[offset:offset + 4]
+    result = 60 * (60 * bcd(hours) + bcd(minutes)) + bcd(seconds)
+    rate = IFO_FRAME_RATES.get(frames >> 6)
+    if rate:
+        result += bcd(frames & 0x3f) / rate
+    return result
+
+def ParsePgc(data, offset):
+    program_count, cell_count = data[offset + 2:offset + 4]
+    program_map, cell_playback = struct.unpack_from('>HH', data,
+            offset + 0xE6)
+    entry_cells = list(data[offset + program_map:
+        offset + program_map + program_count])
+    cells = []
+    for i in range(cell_count):
+        cell = offset + cell_playback + 24 * i
+        # Only the first cell of an angle block counts towards playback.
+        block_mode, block_type = data[cell] >> 6, (data[cell] >> 4) & 3
+        first_sector, = struct.unpack_from('>I', data, cell + 8)
+        cells.append(Cell(ParseIfoTime(data, cell + 4), first_sector,
+            block_type == 1 and block_mode > 1))
+    return Pgc(ParseIfoTime(data, offset + 4), entry_cells, cells)
+
+def ReadVts(path):
+    """
+    Reads a VTS_nn_0.IFO file.
+
+    Returns a list of the (pgc number, program number) chapter entries of
+    each title in the title set, and a list of the title set's Pgcs.
+    """
+    data = ReadIfo(path, b'DVDVIDEO-VTS')
+    ptt_srpt, pgci = (DVD_SECTOR_SIZE * sector
+            for sector in struct.unpack_from('>II', data, 0xC8))
+    title_count, = struct.unpack_from('>H', data, ptt_srpt)
+    end, = struct.unpack_from('>I', data, ptt_srpt + 4)
+    starts = struct.unpack_from('>%dI' % title_count, data, ptt_srpt + 8)
+    ptts = []
+    for start, stop in zip(starts, starts[1:] + (end + 1,)):
+        ptts.append([struct.unpack_from('>HH', data, ptt_srpt + offset)
+            for offset in range(start, stop, 4)])
+    pgc_count, = struct.unpack_from('>H', data, pgci)
+    pgcs = [ParsePgc(data, pgci + struct.unpack_from('>I', data,
+                pgci + 12 + 8 * i)[0])
+            for i in range(pgc_count)]
+    return ptts, pgcs
+
+def ReadIfoTitles(mountpoint):
+    """
+    Reads title durations and chapter structure from a disc's IFO tables,
+    without scanning any video.
+
+    Returns an iterable of IfoTitle objects.
+    """
+    vmg = ReadIfo(FindVideoTsFile(mountpoint, 'VIDEO_TS.IFO'),
+            b'DVDVIDEO-VMG')
+    tt_srpt = DVD_SECTOR_SIZE * struct.unpack_from('>I', vmg, 0xC4)[0]
+    title_count, = struct.unpack_from('>H', vmg, tt_srpt)
+    title_sets = {}
+    for number in range(1, title_count + 1):
+        entry = tt_srpt + 8 + 12 * (number - 1)
+        chapter_count, = struct.unpack_from('>H', vmg, entry + 2)
+        vts, vts_title = vmg[entry + 6:entry + 8]
+        if vts not in title_sets:
+            title_sets[vts] = ReadVts(
+                    FindVideoTsFile(mountpoint, 'VTS_%02d_0.IFO' % vts))
+        ptts, pgcs = title_sets[vts]
+        if not 1 <= vts_title <= len(ptts):
+            raise ValueError('title %d refers to missing VTS %d title %d'
+                    % (number, vts, vts_title))
+
+        seen_pgcns = set()
+        seconds = 0
+        chapter_seconds = []
+        sectors = []
+        for pgcn, pgn in ptts[vts_title - 1][:chapter_count]:
+            if not 1 <= pgcn <= len(pgcs):
+                raise ValueError('title %d refers to missing PGC %d'
+                        % (number, pgcn))
+            pgc = pgcs[pgcn - 1]
+            if not 1 <= pgn <= len(pgc.entry_cells):
+                raise ValueError('title %d refers to missing program %d'
+                        % (number, pgn))
+            if pgcn not in seen_pgcns:
+                seen_pgcns.add(pgcn)
+                seconds += pgc.seconds
+            first_cell = pgc.entry_cells[pgn - 1]
+            if pgn < len(pgc.entry_cells):
+                last_cell = pgc.entry_cells[pgn] - 1
+            else:
+                last_cell = len(pgc.cells)
+            cells = [cell for cell in pgc.cells[first_cell - 1:last_cell]
+                    if not cell.angle]
+            chapter_seconds.append(sum(cell.seconds for cell in cells))
+            sectors += [cell.first_sector for cell in cells]
+        yield IfoTitle(number, seconds, chapter_seconds, sectors)
+
+def BackwardJumps(ifo_title):
+    sectors = ifo_title.cell_sectors
+    return sum(1 for a, b in zip(sectors, sectors[1:]) if b < a)
+
+# Titles at least this fraction of the longest title's duration are
+# considered for the main feature.
+MAIN_FEATURE_MIN_FRACTION = 0.9
+
+# Titles with more than half their chapters shorter than this are assumed
+# to be decoys.
+MIN_CHAPTER_SECONDS = 1
+
+# Titles where more than this fraction of cell transitions jump backwards
+# on the disc are assumed to be decoys.
+MAX_BACKWARD_JUMP_FRACTION = 0.25
+
+def IsDecoy(ifo_title):
+    """
+    Returns True if ifo_title has degenerate chapters, plays any cell more
+    than once, or mostly plays its cells out of disc order.
+    """
+    short_chapters = sum(1 for seconds in ifo_title.chapter_seconds
+            if seconds < MIN_CHAPTER_SECONDS)
+    sectors = ifo_title.cell_sectors
+    return (ifo_title.seconds <= 0
+            or 2 * short_chapters > len(ifo_title.chapter_seconds)
+            or len(set(sectors)) < len(sectors)
+            or BackwardJumps(ifo_title)
+                > MAX_BACKWARD_JUMP_FRACTION * (len(sectors) - 1))
+
+def RankMainFeature(ifo_titles, verbose=False):
+    """
+    Picks the main feature from lightweight IFO metadata.
+
+    Decoy titles (see IsDecoy) are dropped before lengths are compared, so
+    that a long looping or scrambled decoy cannot crowd out the real
+    feature. Among the remaining titles close in length to the longest,
+    the one whose cells play most nearly in disc order wins.
+
+    Returns the winning IfoTitle, or None if there are no candidates.
+    """
+    candidates = [t for t in ifo_titles if not IsDecoy(t)]
+    if not candidates:
+        return None
+    longest = max(t.seconds for t in candidates)
+    candidates = [t for t in candidates
+            if t.seconds >= MAIN_FEATURE_MIN_FRACTION * longest]
+    if verbose:
+        for t in candidates:
+            print('Candidate title %d: %s, %d chapters, %d backward jumps'
+                    % (t.number, SecondsToDuration(t.seconds),
+                        len(t.chapter_seconds), BackwardJumps(t)))
+    return min(candidates,
+            key=lambda t: (BackwardJumps(t), -t.seconds, t.number))
 
 def ConstructTasks(titles, chapter_split):
     for title in titles:
@@ -449,8 +889,189 @@ def TaskFilenames(tasks, output, dry_run=False):
         raise UserError("multiple tasks use same filename")
     return result
 
+def TaskSourceSeconds(task):
+    """
+    Returns the number of seconds of source video covered by task.
+    """
+    if task.chapter is None:
+        return task.title.info['duration'].in_seconds()
+    for chapter in ParseChapters(task.title.info['chapters']):
+        if chapter.number == task.chapter:
+            return chapter.duration.in_seconds()
+    return 0
+
+HISTORY_FILE = os.path.join(os.path.expanduser('~'), '.dvdrip_history.json')
+
+Throughput = namedtuple('Throughput', 'source_seconds wall_seconds bytes')
+Estimate = namedtuple('Estimate', 'wall_seconds bytes')
+
+def LoadHistory(path):
+    """
+    Loads the encode throughput history stored at path.
+
+    The history maps host names to dictionaries mapping HistoryKey values
+    to accumulated Throughput fields.
+    """
+    try:
+        with open(path, encoding=CHAR_ENCODING) as f:
+            history = json.load(f)
+    except FileNotFoundError:
+        return {}
+    except (OSError, ValueError):
+        history = None
+    if not IsValidHistory(history):
+        warn('Ignoring unreadable history file %r.' % path)
+        return {}
+    return history
+
+def IsValidHistory(history):
+    def IsValidEntry(entry):
+        return (isinstance(entry, dict)
+                and set(entry) == set(Throughput._fields)
+                and all(isinstance(v, (int, float)) for v in entry.values()))
+    return (isinstance(history, dict)
+            and all(isinstance(entries, dict)
+                and all(IsValidEntry(e) for e in entries.values())
+                for entries in history.values()))
+
+def SaveHistory(path, history):
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w', encoding=CHAR_ENCODING) as f:
+        json.dump(history, f, indent=2, sort_keys=True)
+    os.replace(tmp_path, path)
+
+# Locks older than this are assumed to be left behind by a crashed run.
+HISTORY_LOCK_TIMEOUT = 30
+
+@contextlib.contextmanager
+def HistoryLock(path):
+    """
+    Holds a lock file beside the history at path, so that concurrent runs
+    on the same host don't overwrite each other's samples.
+    """
+    lock_path = path + '.lock'
+    deadline = time.time() + HISTORY_LOCK_TIMEOUT
+    while True:
+        try:
+            fd = os.open(lock_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+            break
+        except FileExistsError:
+            if time.time() >= deadline:
+                warn('Removing stale lock %r.' % lock_path)
+                RemoveFiles([lock_path])
+                deadline = time.time() + HISTORY_LOCK_TIMEOUT
+            time.sleep(0.1)
+    try:
+        yield
+    finally:
+        os.close(fd)
+        RemoveFiles([lock_path])
+
+def SaveThroughput(path, task, wall_seconds, output_bytes, segments=1):
+    """
+    Adds one encode to the history stored at path, merging with whatever
+    other runs have recorded since it was loaded.
+    """
+    with HistoryLock(path):
+        history = LoadHistory(path)
+        RecordThroughput(history, task, wall_seconds, output_bytes, segments)
+        SaveHistory(path, history)
+
+def HistoryKey(task, segments=1):
+    size = ParseSize(task.title.info['size'])
+    key = '%dx%d %s' % (size.width, size.height, PRESET)
+    segments = len(PlanSegments(task, segments))
+    if segments > 1:
+        key += ' %d segments' % segments
+    return key
+
+def RecordThroughput(history, task, wall_seconds, output_bytes, segments=1):
+    entries = history.setdefault(socket.gethostname(), {})
+    entry = entries.setdefault(HistoryKey(task, segments),
+            dict(Throughput(0, 0, 0)._asdict()))
+    entry['source_seconds'] += TaskSourceSeconds(task)
+    entry['wall_seconds'] += wall_seconds
+    entry['bytes'] += output_bytes
+
+def EstimateTask(history, task, segments=1):
+    """
+    Estimates the cost of task from this host's history of encodes with the
+    same resolution and preset.
+
+    Returns None if there is no usable history.
+    """
+    entry = history.get(socket.gethostname(), {}).get(
+            HistoryKey(task, segments))
+    if not entry:
+        return None
+    throughput = Throughput(**entry)
+    if throughput.source_seconds <= 0:
+        return None
+    source_seconds = TaskSourceSeconds(task)
+    return Estimate(
+            source_seconds * throughput.wall_seconds
+                / throughput.source_seconds,
+            source_seconds * throughput.bytes / throughput.source_seconds)
+
+def SecondsToDuration(seconds):
+    minutes, seconds = divmod(int(round(seconds)), 60)
+    hours, minutes = divmod(minutes, 60)
+    return Duration(hours, minutes, seconds)
+
+def FormatBytes(n):
+    for unit in ('B', 'KiB', 'MiB', 'GiB'):
+        if n < 1024:
+            break
+        n /= 1024
+    else:
+        unit = 'TiB'
+    return '%.1f %s' % (n, unit)
+
+def FormatEstimate(estimate):
+    if estimate is None:
+        return 'no history'
+    return '%s, %s' % (SecondsToDuration(estimate.wall_seconds),
+            FormatBytes(estimate.bytes))
+
+def FindExistingDirectory(path):
+    path = os.path.abspath(path)
+    while not os.path.isdir(path):
+        path = os.path.dirname(path)
+    return path
+
+def DisplayEstimates(tasks, history, output=None, segments=1):
+    """
+    Prints estimated wall time and output size of each task and of all
+    tasks together, and compares the latter with free space at output.
+    """
+    print('Estimates (wall time, output size):')
+    total = Estimate(0, 0)
+    complete = True
+    for task in tasks:
+        estimate = EstimateTask(history, task, segments)
+        if task.chapter is None:
+            label = 'Title % 3d' % task.title.number
+        else:
+            label = 'Title % 3d, chapter % 3d' % (task.title.number,
+                    task.chapter)
+        print('  %s: %s' % (label, FormatEstimate(estimate)))
+        if estimate is None:
+            complete = False
+        else:
+            total = Estimate(*(a + b for a, b in zip(total, estimate)))
+    print('  Total: %s%s' % (FormatEstimate(total),
+        '' if complete else ' (excluding tasks with no history)'))
+    if output is not None:
+        directory = FindExistingDirectory(output)
+        free = shutil.disk_usage(directory).free
+        print('  Free space in %r: %s' % (directory, FormatBytes(free)))
+        if total.bytes > free:
+            warn('Estimated output size exceeds free space in %r.'
+                    % directory)
+    print()
+
 def PerformTasks(dvd, tasks, title_count, filenames,
-        dry_run=False, verbose=False):
+        dry_run=False, verbose=False, history_file=None, segments=1):
     for task, filename in zip(tasks, filenames):
         print('=' * 78)
         if task.chapter is None:
@@ -462,7 +1083,16 @@ def PerformTasks(dvd, tasks, title_count, filenames,
                     % (task.title.number, title_count, task.chapter,
                         num_chapters, filename))
         print('-' * 78)
-        dvd.RipTitle(task, filename, dry_run, verbose)
+        start_time = time.time()
+        completed = dvd.RipTitle(task, filename, dry_run, verbose, segments)
+        if (completed and history_file is not None
+                and os.path.exists(filename)):
+            try:
+                SaveThroughput(history_file, task, time.time() - start_time,
+                        os.path.getsize(filename), segments)
+            except OSError as exc:
+                warn('Throughput not recorded in %r: %s'
+                        % (history_file, exc))
 
 Size = namedtuple('Size',
         ['width', 'height', 'pix_aspect_width', 'pix_aspect_height', 'fps'])
@@ -618,6 +1248,16 @@ def ParseArgs():
             default=15,
             help="Amount of time to wait for a mountpoint to be mounted",
             type=float)
+    parser.add_argument('--segments',
+            default=1,
+            help="""Split each title at chapter boundaries into up to this
+            many segments, encode them in parallel, and join them into a
+            single file (requires ffmpeg).""",
+            type=int)
+    parser.add_argument('--history',
+            default=HISTORY_FILE,
+            help="""File in which to record encode throughput, used to
+            estimate time and size in scan and dry-run modes.""")
     args = parser.parse_args()
     if not args.scan and args.output is None:
         raise UserError("output argument is required")
@@ -655,15 +1295,20 @@ def main():
     dvd = DVD(args.input, args.verbose, args.mount_timeout)
     print('Reading from %r' % dvd.mountpoint)
     title_numbers = parse_titles_arg(args.titles)
+    if args.main_feature:
+        main_feature = dvd.FindMainFeatureNumber(title_numbers)
+        if main_feature is not None:
+            title_numbers = [main_feature]
     titles = tuple(dvd.ScanTitles(title_numbers, args.verbose))
+    if args.main_feature and len(titles) > 1:
+        titles = (FindMainFeature(titles, args.verbose),)
+    history = LoadHistory(args.history)
 
     if args.scan:
         DisplayScan(titles)
+        DisplayEstimates(tuple(ConstructTasks(titles, args.chapter_split)),
+                history, segments=args.segments)
     else:
-        if args.main_feature and len(titles) > 1:
-            # TODO: make this affect scan as well
-            titles = [FindMainFeature(titles, args.verbose)]
-
         if not titles:
             raise UserError("No titles to rip")
         else:
@@ -674,12 +1319,25 @@ def main():
 
             filenames = TaskFilenames(tasks, args.output, dry_run=args.dry_run)
             # Don't stomp on existing files
-            for filename in filenames:
-                if os.path.exists(filename):
-                    raise UserError('%r already exists' % filename)
+            for task, filename in zip(tasks, filenames):
+                for name in [filename] + TaskTempFiles(task, filename,
+                        args.segments):
+                    if os.path.exists(name):
+                        raise UserError('%r already exists' % name)
+
+            if args.segments > 1 and not args.dry_run:
+                for tool in (FFMPEG, FFPROBE):
+                    if shutil.which(tool) is None:
+                        raise UserError('%s is required by --segments'
+                                % tool)
+
+            if args.dry_run:
+                DisplayEstimates(tasks, history, args.output, args.segments)
 
             PerformTasks(dvd, tasks, len(titles), filenames,
-                    dry_run=args.dry_run, verbose=args.verbose)
+                    dry_run=args.dry_run, verbose=args.verbose,
+                    history_file=args.history,
+                    segments=args.segments)
 
             print('=' * 78)
             if not args.dry_run: